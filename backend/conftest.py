@@ -3,7 +3,9 @@ Pytest configuration file.
 Sets up environment variables for testing to prevent import errors.
 """
 import os
+import httpx
 import pytest
+import pytest_asyncio
 
 # Set test environment variables before any imports
 # This prevents the ValueError from being raised when main.py imports
@@ -11,9 +13,48 @@ os.environ.setdefault("OPENAI_API_KEY", "test_openai_key_for_testing")
 os.environ.setdefault("YOUTUBE_API_KEY", "test_youtube_key_for_testing")
 os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost:5173,https://gomicrolearn.vercel.app")
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-integration", action="store_true", default=False,
+        help="run tests marked integration (they call the real OpenAI/YouTube APIs)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip integration tests unless --run-integration is given."""
+    if config.getoption("--run-integration"):
+        return
+    skip_integration = pytest.mark.skip(reason="needs --run-integration")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip_integration)
+
+
 @pytest.fixture(autouse=True)
 def reset_env():
     """Ensure test environment variables are set for each test."""
     yield
     # Cleanup if needed (not required for this case)
 
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty syllabus/video caches so results don't leak between tests."""
+    import main
+    main.syllabus_cache.clear()
+    main.video_cache.clear()
+    yield
+    main.syllabus_cache.clear()
+    main.video_cache.clear()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def api_client():
+    """
+    One in-process HTTP client for the whole session, calling the ASGI app directly
+    on the session event loop (no per-request loop like TestClient).
+    """
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
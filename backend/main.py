@@ -1,18 +1,41 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import os
 import json
+import logging
 import re
-from openai import OpenAI
+import asyncio
+import secrets
+import hashlib
+from contextlib import asynccontextmanager
+import openai
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
-import requests
+import httpx
+import orjson
+import msgspec
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+# Logging is configured by the server (uvicorn), not at import. httpx logs every
+# request URL at INFO; keep it quiet even if the root logger is turned up.
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Load keys
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_MAX_CONCURRENCY = 20  # In-flight YouTube searches; matches the HTTP pool size
+SYLLABUS_MODEL = os.getenv("SYLLABUS_MODEL", "gpt-4.1-nano")  # Smallest model that handles the JSON task
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")  # Enables admin endpoints when set
+BATCH_POLL_INTERVAL = 60  # Seconds between OpenAI Batch API status checks
+BATCH_DOWNLOAD_ATTEMPTS = 5  # Tries at fetching a finished batch's results file
+COURSE_CACHE_CONTROL = "public, max-age=3600"  # Lets browsers/CDNs reuse a course for an hour
 
 # Validate API keys on startup
 if not OPENAI_API_KEY:
@@ -20,9 +43,60 @@ if not OPENAI_API_KEY:
 if not YOUTUBE_API_KEY:
     raise ValueError("YOUTUBE_API_KEY environment variable is required")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=2)  # SDK retries 429/5xx with backoff
+
+# Shared HTTP client so YouTube lookups reuse pooled connections across requests.
+# HTTP/2 lets concurrent module lookups multiplex over a single TLS connection.
+http_client = httpx.AsyncClient(
+    http2=True,
+    # ✅ Fail fast on unreachable hosts; tenacity retries transient failures
+    timeout=httpx.Timeout(5.0, connect=2.0),
+    # Keep every pooled connection alive so bursts of lookups skip the TLS handshake
+    limits=httpx.Limits(max_connections=YOUTUBE_MAX_CONCURRENCY, max_keepalive_connections=YOUTUBE_MAX_CONCURRENCY)
+)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson (several times faster than stdlib json)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+async def warm_up_connections():
+    """
+    Open pooled connections (DNS + TLS + HTTP/2) to YouTube and OpenAI so the
+    first user request after a deploy or cold start doesn't pay for them.
+    Failures are logged and otherwise ignored - the app still works cold.
+    """
+    async def warm_youtube():
+        try:
+            await http_client.head("https://www.googleapis.com/", timeout=5)
+        except httpx.HTTPError as e:
+            logger.warning("YouTube warm-up failed: %s: %s", type(e).__name__, e)
+
+    async def warm_openai():
+        try:
+            # Single attempt: retries would only delay startup
+            await client.with_options(max_retries=0, timeout=5).models.list()
+        except openai.APIError as e:
+            logger.warning("OpenAI warm-up failed: %s: %s", type(e).__name__, e)
+
+    await asyncio.gather(warm_youtube(), warm_openai())
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created at import time, which with `uvicorn --workers N` happens
+    # separately in each spawned worker process, so no connection pool is shared
+    await warm_up_connections()
+    yield
+    # Batch polls can outlive a deploy by up to 24h; cancel them so shutdown
+    # doesn't wait on them (the batches themselves keep running at OpenAI)
+    for poller in batch_pollers:
+        poller.cancel()
+    await asyncio.gather(*batch_pollers, return_exceptions=True)
+    await http_client.aclose()
+    await client.close()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # 🔒 SECURITY: CORS - Only allow specific origins
 # Get allowed origins from environment or use defaults
@@ -43,6 +117,9 @@ app.add_middleware(
 )
 
 # --- INPUT VALIDATION ---
+# Anything except letters, numbers, spaces, and common punctuation
+TOPIC_DISALLOWED_PATTERN = re.compile(r'[^\w\s\-.,!?()\']')
+
 def validate_and_sanitize_topic(topic: str) -> str:
     """
     Validate and sanitize topic input to prevent injection attacks.
@@ -56,85 +133,312 @@ def validate_and_sanitize_topic(topic: str) -> str:
     
     # Remove potentially dangerous characters but allow normal text
     # Keep letters, numbers, spaces, and common punctuation
-    sanitized = re.sub(r'[^\w\s\-.,!?()\']', '', topic)
-    sanitized = sanitized.strip()
+    sanitized = TOPIC_DISALLOWED_PATTERN.sub('', topic).strip()
     
     if len(sanitized) < 1:
         raise ValueError("Topic must contain at least one valid character")
     
     return sanitized
 
-# --- THE LIBRARIAN (AI) ---
-def generate_syllabus(topic: str):
+# --- CACHING ---
+# Identical topics / search terms would otherwise re-hit the paid LLM and the
+# quota-limited YouTube API on every request.
+syllabus_cache = TTLCache(maxsize=1024, ttl=86400)  # sanitized topic -> Syllabus
+video_cache = TTLCache(maxsize=4096, ttl=3600)  # cleaned search term -> tuple of video IDs (results churn faster)
+inflight = {}  # (cache id, key) -> task shared by concurrent identical requests
+
+async def get_or_compute(cache: TTLCache, key: str, compute):
     """
-    Asks the LLM to break a topic into 3-5 sub-modules.
-    Returns a strict JSON structure.
+    Return cache[key], awaiting compute() to fill it on a miss.
+    Concurrent misses for the same key are coalesced onto one shared task, so a
+    burst of identical requests makes a single upstream call. Falsy results
+    (failures) are shared with everyone waiting but not cached.
     """
-    print(f"Librarian is thinking about: {topic}...")
-    
-    # ✅ FIXED: Use JSON escaping to prevent prompt injection
-    # Escape the topic for safe inclusion in JSON/string context
-    topic_escaped = json.dumps(topic)[1:-1]  # Remove outer quotes after JSON encoding
-    
-    prompt = f"""Create a micro-learning curriculum for: {topic_escaped}.
+    if key in cache:
+        return cache[key]
+
+    flight_key = (id(cache), key)
+    task = inflight.get(flight_key)
+    if task is None:
+        task = asyncio.ensure_future(fill_cache(cache, key, compute))
+        inflight[flight_key] = task
+        task.add_done_callback(lambda _: inflight.pop(flight_key, None))
+    # Shielded so one client disconnecting doesn't cancel the call for the others
+    return await asyncio.shield(task)
+
+async def fill_cache(cache: TTLCache, key: str, compute):
+    value = await compute()
+    if value:
+        cache[key] = value
+    return value
+
+# --- THE LIBRARIAN (AI) ---
+SYLLABUS_PROMPT_TEMPLATE = """Create a micro-learning curriculum for: {topic_escaped}.
 Return ONLY valid JSON. No markdown. No intro text.
 Structure:
 {{
-    "topic": {json.dumps(topic)},
+    "topic": {topic_json},
     "modules": [
         {{ "id": 1, "title": "Short Title", "description": "One sentence summary", "search_term": "Optimized YouTube Shorts query" }}
     ]
 }}
 Limit to 3-5 modules. Make it beginner friendly."""
 
+def build_syllabus_prompt(topic: str) -> str:
+    """Build the curriculum prompt for a (sanitized) topic."""
+    # ✅ FIXED: Use JSON escaping to prevent prompt injection
+    # Escape the topic for safe inclusion in JSON/string context
+    topic_json = json.dumps(topic)
+    topic_escaped = topic_json[1:-1]  # Remove outer quotes after JSON encoding
+    
+    return SYLLABUS_PROMPT_TEMPLATE.format(topic_escaped=topic_escaped, topic_json=topic_json)
+
+def build_syllabus_request(topic: str) -> dict:
+    """Chat completion parameters shared by the live, streaming and batch syllabus calls."""
+    return {
+        "model": SYLLABUS_MODEL,
+        "messages": [{"role": "user", "content": build_syllabus_prompt(topic)}],
+        "temperature": 0.7,
+        "response_format": {"type": "json_object"},  # Native JSON mode: no markdown fences
+        "max_tokens": 600,  # Enough for 5 modules; bounds generation time and cost
+    }
+
+class Module(msgspec.Struct):
+    """One syllabus module, as returned by the LLM (before videos are attached)."""
+    id: int
+    title: str
+    description: str = ""
+    search_term: str = ""
+
+class Syllabus(msgspec.Struct):
+    topic: str
+    modules: List[Module]
+
+def parse_syllabus(content: str) -> Syllabus:
+    """
+    Decode the LLM's syllabus JSON straight into typed structs in a single pass.
+    strict=False tolerates numeric strings such as "id": "1".
+    Raises msgspec.DecodeError on invalid or wrongly shaped output.
+    """
+    return msgspec.json.decode(content, type=Syllabus, strict=False)
+
+async def generate_syllabus(topic: str) -> Optional[Syllabus]:
+    """
+    Asks the LLM to break a topic into 3-5 sub-modules.
+    Returns a Syllabus (cached per topic - don't mutate it).
+    """
+    return await get_or_compute(syllabus_cache, topic, lambda: request_syllabus(topic))
+
+async def request_syllabus(topic: str) -> Optional[Syllabus]:
+    """
+    Uncached LLM call behind generate_syllabus. Returns None on failure,
+    including a syllabus without modules, so it isn't cached.
+    """
+    logger.info("Librarian is thinking about: %s...", topic)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
+        response = await client.chat.completions.create(
+            **build_syllabus_request(topic),
             timeout=30  # ✅ Added timeout to prevent hanging requests
         )
-        content = response.choices[0].message.content
-        # Clean potential markdown code blocks
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        return json.loads(content)
-    except json.JSONDecodeError as e:
-        print(f"AI JSON parsing error: {e}")
+        syllabus = parse_syllabus(response.choices[0].message.content)
+    except (openai.APIError, msgspec.DecodeError):
+        # APIError covers timeouts, connection errors and rate limits; anything
+        # else is a bug and propagates to the endpoint's error handling
+        logger.exception("AI syllabus generation failed")
         return None
-    except Exception as e:
-        print(f"AI Error: {type(e).__name__}: {str(e)}")
+    if not syllabus.modules:
+        logger.warning("AI syllabus for %s has no modules", topic)
         return None
+    return syllabus
+
+class ModuleStreamParser:
+    """
+    Incrementally extracts module objects from a streamed syllabus JSON document.
+
+    Tracks nesting depth (ignoring braces inside strings) and the most recent
+    key of the top-level object, and emits every object that sits directly
+    inside the top-level "modules" array as soon as it closes. Objects in any
+    other array are ignored. `complete` turns True once the top-level object
+    closes, so a truncated stream (e.g. cut off by max_tokens) can be told apart.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_chars = None  # Characters of the top-level string currently being read
+        self._key = None  # Last string read at the top level (the current key)
+        self._in_modules = False  # Inside the top-level "modules" array
+        self._buffer = []  # Characters of the module object currently being read
+        self.complete = False
+
+    def feed(self, text: str) -> list:
+        """Consume the next chunk of text and return any modules it completed."""
+        modules = []
+        for char in text:
+            if self._buffer:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._key = "".join(self._key_chars)
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key_chars = []
+            elif char in "{[":
+                if self._depth == 1:
+                    # A value of the top-level object opens; only "modules" holds modules
+                    self._in_modules = char == "[" and self._key == "modules"
+                # Depth 2 inside the "modules" array is a module
+                if char == "{" and self._depth == 2 and self._in_modules and not self._buffer:
+                    self._buffer.append(char)
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                if self._depth == 2 and self._buffer:
+                    try:
+                        modules.append(orjson.loads("".join(self._buffer)))
+                    except orjson.JSONDecodeError as e:
+                        logger.warning("AI JSON parsing error in streamed module: %s", e)
+                    self._buffer = []
+        return modules
+
+async def stream_syllabus_modules(topic: str):
+    """
+    Streams the syllabus from the LLM and yields each module dict as soon as
+    its JSON object is complete. Cached syllabi are replayed without an LLM call.
+    """
+    cached = syllabus_cache.get(topic)
+    if cached:
+        for module in cached.modules:
+            yield msgspec.to_builtins(module)
+        return
+
+    logger.info("Librarian is streaming: %s...", topic)
+
+    stream = await client.chat.completions.create(
+        **build_syllabus_request(topic),
+        timeout=30,
+        stream=True
+    )
+    parser = ModuleStreamParser()
+    modules = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            for raw_module in parser.feed(content):
+                try:
+                    module = msgspec.convert(raw_module, Module, strict=False)
+                except msgspec.ValidationError as e:
+                    logger.warning("AI JSON parsing error in streamed module: %s", e)
+                    continue
+                modules.append(module)
+                yield msgspec.to_builtins(module)
+
+    # Only a finished document is cached: a truncated one would otherwise be
+    # served as the topic's full syllabus until the cache entry expires
+    if modules and parser.complete:
+        syllabus_cache[topic] = Syllabus(topic=topic, modules=modules)
+    elif modules:
+        logger.warning("Syllabus stream for %s ended before the document closed; not caching", topic)
 
 # --- THE CURATOR (YouTube) ---
+# YouTube video IDs are 11 characters, alphanumeric with some special chars
+VIDEO_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{11}')
+
 def validate_video_id(video_id: str) -> bool:
     """Validate YouTube video ID format."""
-    # YouTube video IDs are 11 characters, alphanumeric with some special chars
-    return bool(re.match(r'^[a-zA-Z0-9_-]{11}$', video_id))
+    # Length check first so bad IDs never reach the regex engine
+    return len(video_id) == 11 and VIDEO_ID_PATTERN.fullmatch(video_id) is not None
 
-def get_videos_for_module(search_term: str):
+BACKUP_VIDEO_IDS = ("N20k-rV-iXQ", "G2fqAlgmoPo")  # Served when no YouTube API key is configured
+FALLBACK_VIDEO_IDS = ("N20k-rV-iXQ",)  # Served when a search fails or finds nothing
+PLACEHOLDER_VIDEO_IDS = frozenset(BACKUP_VIDEO_IDS + FALLBACK_VIDEO_IDS)
+
+async def get_videos_for_module(search_term: str):
     """
     Get videos for a module from YouTube API.
-    Returns list of valid video IDs.
+    Returns a fresh list of valid video IDs, so callers may mutate it (the
+    cached results and fallbacks are immutable tuples).
     """
     if not YOUTUBE_API_KEY:
-        return ["N20k-rV-iXQ", "G2fqAlgmoPo"]  # Backup IDs
+        return list(BACKUP_VIDEO_IDS)
 
     # Sanitize search term
     search_term_clean = search_term[:100]  # Limit length
     
+    ids = await get_or_compute(video_cache, search_term_clean, lambda: search_youtube(search_term_clean))
+    return list(ids or FALLBACK_VIDEO_IDS)  # Fallback if empty
+
+def is_transient_youtube_error(error: BaseException) -> bool:
+    """Timeouts, dropped connections, rate limiting and 5xx are worth retrying."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError))
+
+@retry(
+    retry=retry_if_exception(is_transient_youtube_error),
+    wait=wait_exponential(multiplier=0.2, max=2.0),
+    stop=stop_after_attempt(3),
+    reraise=True
+)
+async def fetch_youtube_search(params: dict) -> httpx.Response:
+    """GET the YouTube search endpoint, retrying transient failures with backoff."""
+    # Held per attempt, so backoff sleeps don't tie up a slot
+    async with get_youtube_semaphore():
+        # Key in a header, not the query string, so it never appears in logged URLs
+        res = await http_client.get(
+            YOUTUBE_SEARCH_URL, params=params, headers={"X-Goog-Api-Key": YOUTUBE_API_KEY}
+        )
+    res.raise_for_status()  # ✅ Raise exception for HTTP errors
+    return res
+
+# Large syllabi fan out one search per module; queue the excess here instead of
+# stampeding the connection pool (and its PoolTimeout)
+youtube_semaphore = None
+
+def get_youtube_semaphore() -> asyncio.Semaphore:
+    """
+    The YouTube concurrency limit, created on first use. Before Python 3.10 a
+    Semaphore binds to the loop current at creation, so it must not be built at
+    import time, before the server's loop exists.
+    """
+    global youtube_semaphore
+    if youtube_semaphore is None:
+        youtube_semaphore = asyncio.Semaphore(YOUTUBE_MAX_CONCURRENCY)
+    return youtube_semaphore
+
+async def search_youtube(search_term_clean: str) -> tuple:
+    """Uncached YouTube search behind get_videos_for_module. Returns () on failure."""
     params = {
         "part": "id",
         "q": f"{search_term_clean} #shorts",
         "type": "video",
         "videoDuration": "short",
         "maxResults": 3,
-        "key": YOUTUBE_API_KEY
+        "fields": "items/id/videoId"  # Only what we read; trims the response envelope
     }
     try:
-        res = requests.get(YOUTUBE_SEARCH_URL, params=params, timeout=10)  # ✅ Added timeout
-        res.raise_for_status()  # ✅ Raise exception for HTTP errors
-        data = res.json()
+        res = await fetch_youtube_search(params)
+        data = orjson.loads(res.content)
         
         # ✅ FIXED: Validate video IDs before returning
         ids = []
@@ -144,19 +448,51 @@ def get_videos_for_module(search_term: str):
                 if validate_video_id(video_id):
                     ids.append(video_id)
         
-        return ids if ids else ["N20k-rV-iXQ"]  # Fallback if empty
-    except requests.RequestException as e:
-        print(f"YouTube API error: {type(e).__name__}: {str(e)}")
-        return ["N20k-rV-iXQ"]
+        return tuple(ids)
+    except httpx.HTTPError as e:
+        logger.warning("YouTube API error: %s: %s", type(e).__name__, e)
+        return ()
     except (KeyError, ValueError) as e:
-        print(f"YouTube API response parsing error: {type(e).__name__}: {str(e)}")
-        return ["N20k-rV-iXQ"]
+        logger.warning("YouTube API response parsing error: %s: %s", type(e).__name__, e)
+        return ()
+
+def claim_unused_videos(video_ids: List[str], used_video_ids: set) -> List[str]:
+    """Return the videos not used by an earlier module, marking them as used."""
+    new_videos = [video_id for video_id in video_ids if video_id not in used_video_ids]
+    used_video_ids.update(new_videos)
+    return new_videos
 
-@app.get("/generate_course")
-def generate_course(topic: str = Query(..., min_length=1, max_length=200)):
+def course_etag(body: bytes) -> str:
+    """
+    Weak ETag for a rendered course. Video results expire independently of the
+    syllabus, so only the content itself identifies a version of the course.
+    """
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+def strip_weak(tag: str) -> str:
+    """Drop the weak-validator prefix so W/"x" and "x" compare equal."""
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or strip_weak(etag) in [strip_weak(tag) for tag in tags]
+
+@app.get("/generate_course", response_model=None, response_class=ORJSONResponse)
+async def generate_course(
+    request: Request,
+    topic: str = Query(..., min_length=1, max_length=200)
+):
     """
     Generate a course curriculum for a given topic.
     
+    Responses carry an ETag and Cache-Control; a matching If-None-Match gets
+    a 304 without a body. Courses padded with placeholder videos (YouTube
+    unavailable) get neither, so clients don't hold on to them.
+    
     Args:
         topic: The topic to create a curriculum for (1-200 characters)
     
@@ -168,7 +504,7 @@ def generate_course(topic: str = Query(..., min_length=1, max_length=200)):
         sanitized_topic = validate_and_sanitize_topic(topic)
         
         # 1. Ask AI for Syllabus
-        syllabus = generate_syllabus(sanitized_topic)
+        syllabus = await generate_syllabus(sanitized_topic)
         
         if not syllabus:
             raise HTTPException(
@@ -177,44 +513,256 @@ def generate_course(topic: str = Query(..., min_length=1, max_length=200)):
             )
 
         # 2. Fill Syllabus with Videos (ensure NO duplicates across modules)
+        modules = syllabus.modules
+        logger.info("Curating videos for %d modules...", len(modules))
+
+        # Fire all YouTube lookups concurrently; results come back in module order
+        results = await asyncio.gather(
+            *[get_videos_for_module(module.search_term) for module in modules]
+        )
+
+        # Strictly filter out videos that have already been used in previous modules
+        # NO duplicates allowed - modules left without videos are dropped
         used_video_ids = set()  # Track videos already used across all modules
-        
-        for module in syllabus.get("modules", []):
-            search_term = module.get("search_term", "")
-            print(f"Curating videos for: {module.get('title', 'Unknown')}...")
-            
-            # Get videos for this module
-            all_videos = get_videos_for_module(search_term)
-            
-            # Strictly filter out videos that have already been used in previous modules
-            # NO duplicates allowed - even if it means a module has fewer videos
-            new_videos = [video_id for video_id in all_videos if video_id not in used_video_ids]
-            
-            # Update the used set and assign videos to module
-            used_video_ids.update(new_videos)
-            module["videos"] = new_videos
-
-        # 3. Filter out modules with empty video arrays
-        syllabus["modules"] = [module for module in syllabus.get("modules", []) if module.get("videos")]
+        # Built fresh so the cached syllabus is never mutated
+        course = {"topic": syllabus.topic, "modules": [
+            {**msgspec.to_builtins(module), "videos": new_videos}
+            for module, all_videos in zip(modules, results)
+            if (new_videos := claim_unused_videos(all_videos, used_video_ids))
+        ]}
 
         # Ensure we have at least one module
-        if not syllabus["modules"]:
+        if not course["modules"]:
             raise HTTPException(
                 status_code=500,
                 detail="Unable to generate curriculum with unique videos. Please try a different topic."
             )
 
-        return syllabus
+        # Returning the response directly skips FastAPI's jsonable_encoder pass
+        response = ORJSONResponse(course)
+        if any(video_id in PLACEHOLDER_VIDEO_IDS for module in course["modules"] for video_id in module["videos"]):
+            return response
+
+        # Hash the rendered course: a repeat request is served from the syllabus
+        # and video caches, so revalidation costs no LLM or YouTube call
+        etag = course_etag(response.body)
+        cache_headers = {"ETag": etag, "Cache-Control": COURSE_CACHE_CONTROL}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+        return response
     except ValueError as e:
         # ✅ FIXED: Return appropriate error for validation failures
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
-    except Exception as e:
+    except Exception:
         # ✅ FIXED: Don't expose internal error details
-        print(f"Unexpected error: {type(e).__name__}: {str(e)}")
+        logger.exception("Unexpected error while generating course")
         raise HTTPException(
             status_code=500,
             detail="An error occurred while generating the curriculum."
-        )
\ No newline at end of file
+        )
+
+def format_sse(data: dict, event: str = None) -> str:
+    """Format a payload as a Server-Sent Events message."""
+    message = f"data: {orjson.dumps(data).decode()}\n\n"
+    return f"event: {event}\n{message}" if event else message
+
+@app.get("/generate_course/stream")
+async def generate_course_stream(topic: str = Query(..., min_length=1, max_length=200)):
+    """
+    Stream a course curriculum for a given topic as Server-Sent Events.
+    
+    Each module is sent as a `data:` event (with its videos) as soon as the LLM
+    has finished writing it and its YouTube lookup has completed. The stream ends
+    with a `done` event, or an `error` event if no curriculum could be built.
+    
+    Args:
+        topic: The topic to create a curriculum for (1-200 characters)
+    """
+    try:
+        sanitized_topic = validate_and_sanitize_topic(topic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def dispatch_lookups(lookups: asyncio.Queue):
+        """Read modules off the LLM stream, starting each YouTube lookup immediately."""
+        try:
+            async for module in stream_syllabus_modules(sanitized_topic):
+                logger.info("Curating videos for: %s...", module.get("title", "Unknown"))
+                videos = asyncio.ensure_future(get_videos_for_module(module.get("search_term", "")))
+                await lookups.put((module, videos))
+        finally:
+            await lookups.put(None)  # End of syllabus (or failure)
+
+    async def event_stream():
+        used_video_ids = set()  # Track videos already used across all modules
+        sent_modules = 0
+        # YouTube lookups overlap with the rest of the LLM stream; modules are
+        # still emitted in syllabus order so duplicate filtering stays stable
+        lookups = asyncio.Queue()
+        dispatcher = asyncio.ensure_future(dispatch_lookups(lookups))
+        try:
+            while True:
+                item = await lookups.get()
+                if item is None:
+                    break
+                module, videos = item
+                all_videos = await videos
+                
+                # Same rule as /generate_course: NO duplicates, skip modules left empty
+                new_videos = claim_unused_videos(all_videos, used_video_ids)
+                if not new_videos:
+                    continue
+                module["videos"] = new_videos
+                sent_modules += 1
+                yield format_sse(module)
+            await dispatcher  # Surface LLM stream errors
+        except Exception:
+            # The response has already started, so report failures in-band
+            # ✅ Don't expose internal error details
+            logger.exception("Unexpected error while streaming course")
+            yield format_sse({"detail": "An error occurred while generating the curriculum."}, event="error")
+            return
+        finally:
+            dispatcher.cancel()  # Client went away or we errored; stop reading the LLM
+
+        if not sent_modules:
+            yield format_sse({"detail": "Unable to generate curriculum. Please try again."}, event="error")
+            return
+        yield format_sse({"topic": sanitized_topic, "module_count": sent_modules}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- BULK PRECOMPUTE (OpenAI Batch API) ---
+class PrecomputeRequest(BaseModel):
+    topics: List[str] = Field(..., min_length=1, max_length=1000)
+
+batch_pollers = set()  # Running poll_syllabus_batch tasks, cancelled on shutdown
+
+async def poll_syllabus_batch(batch_id: str, topics_by_request_id: dict):
+    """
+    Wait for a syllabus batch to finish, then load its results into the syllabus cache.
+    """
+    while True:
+        try:
+            batch = await client.batches.retrieve(batch_id)
+        except openai.APIError:
+            # A blip during a poll that can last 24h shouldn't drop a paid batch
+            logger.exception("Polling syllabus batch %s failed; retrying", batch_id)
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+            continue
+        if batch.status == "completed":
+            break
+        if batch.status in ("failed", "expired", "cancelled"):
+            logger.warning("Syllabus batch %s ended with status: %s", batch_id, batch.status)
+            return
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+
+    if not batch.output_file_id:
+        logger.warning("Syllabus batch %s completed without output", batch_id)
+        return
+
+    for attempt in range(1, BATCH_DOWNLOAD_ATTEMPTS + 1):
+        try:
+            output = await client.files.content(batch.output_file_id)
+            break
+        except openai.APIError:
+            # Same as polling: the results are paid for, so don't drop them on a blip
+            logger.exception("Downloading syllabus batch %s results failed (attempt %d/%d)",
+                             batch_id, attempt, BATCH_DOWNLOAD_ATTEMPTS)
+            if attempt == BATCH_DOWNLOAD_ATTEMPTS:
+                return
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+    cached = 0
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = orjson.loads(line)
+            topic = topics_by_request_id[result["custom_id"]]
+            syllabus = parse_syllabus(result["response"]["body"]["choices"][0]["message"]["content"])
+        except (KeyError, IndexError, TypeError, orjson.JSONDecodeError, msgspec.DecodeError) as e:
+            # Failed requests have no response body; skip them, they'll be generated live
+            logger.warning("Skipping batch result: %s: %s", type(e).__name__, e)
+            continue
+        if not syllabus.modules:
+            logger.warning("Skipping batch result for %s: no modules", topic)
+            continue
+        syllabus_cache[topic] = syllabus
+        cached += 1
+    logger.info("Syllabus batch %s: cached %d/%d topics", batch_id, cached, len(topics_by_request_id))
+
+@app.post("/precompute_courses", status_code=202)
+async def precompute_courses(
+    request: PrecomputeRequest,
+    x_admin_key: Optional[str] = Header(None)
+):
+    """
+    Pre-warm the syllabus cache for a catalog of topics via the OpenAI Batch API
+    (half the token price of live calls, no per-request rate limits).
+    
+    Requires the `X-Admin-Key` header to match ADMIN_API_KEY. Results are polled
+    in the background and cached as they complete (within 24h).
+    The cache is per process, so with several uvicorn workers only the worker
+    serving this call is warmed.
+    
+    Returns:
+        JSON object with the batch ID and the number of topics submitted
+    """
+    # 🔒 SECURITY: Admin-only, and disabled entirely unless ADMIN_API_KEY is configured
+    if not ADMIN_API_KEY or not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    try:
+        topics = list(dict.fromkeys(validate_and_sanitize_topic(topic) for topic in request.topics))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Topics that are already cached don't need to be paid for again
+    topics = [topic for topic in topics if topic not in syllabus_cache]
+    if not topics:
+        return {"batch_id": None, "topics": 0}
+
+    topics_by_request_id = {f"topic-{i}": topic for i, topic in enumerate(topics)}
+    batch_input = b"\n".join(
+        orjson.dumps({
+            "custom_id": request_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": build_syllabus_request(topic)
+        })
+        for request_id, topic in topics_by_request_id.items()
+    )
+
+    try:
+        batch_file = await client.files.create(
+            file=("syllabus_batch.jsonl", batch_input),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+    except openai.APIError:
+        # ✅ Don't expose internal error details
+        logger.exception("Batch submission error")
+        raise HTTPException(status_code=500, detail="An error occurred while submitting the batch.")
+
+    # A task of its own rather than a BackgroundTask, which would keep the
+    # request (and uvicorn's graceful shutdown) waiting for the whole poll
+    poller = asyncio.ensure_future(poll_syllabus_batch(batch.id, topics_by_request_id))
+    batch_pollers.add(poller)
+    poller.add_done_callback(batch_pollers.discard)
+    return {"batch_id": batch.id, "topics": len(topics)}
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -1,14 +1,22 @@
 import os
+import functools
+import pytest
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+@functools.lru_cache(maxsize=None)
+def _env():
+    """Load the .env file on first use rather than at import (pytest collection)."""
+    load_dotenv()
+    return os.environ
+
+# Live API check: only runs with --run-integration, exempt from the suite-wide socket ban
+pytestmark = [pytest.mark.integration, pytest.mark.enable_socket]
 
 def test_openai_api_key():
     """Test that the OPENAI_API_KEY is working correctly."""
     
     # Get the API key from environment variable
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = _env().get("OPENAI_API_KEY")
     
     if not api_key:
         print("❌ ERROR: OPENAI_API_KEY not found in environment variables")